@@ -1,14 +1,21 @@
+import re
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 load_dotenv()
 
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
 import PyPDF2
+import pypdfium2
 from typing import List
 
+try:
+    from sources._embeddings import get_embeddings
+except ImportError:
+    from _embeddings import get_embeddings
+
 FILE_PATHS = [
     "documents/sample.pdf"
     # "documents/manual.txt",
@@ -17,19 +24,59 @@ FILE_PATHS = [
 
 VECTOR_DB_DIR = "vector_store"
 
+_WS_RE = re.compile(r"\s+")
+
 def clean_text(text: str) -> str:
-    return ' '.join(text.split())
+    # One C-level regex pass instead of split/join, which materializes a
+    # list of every token before re-joining.
+    return _WS_RE.sub(' ', text).strip()
 
-def read_pdf_file(file_path: str) -> str:
+def _extract_pdf_page(file_path: str, page_index: int) -> str:
+    # Worker: re-open the PDF in the subprocess and extract one page.
+    # pypdfium2 binds Google's PDFium (C++) and extracts text 5-10x faster
+    # than PyPDF2's pure-Python loop; PyPDF2 stays as a fallback for PDFs
+    # PDFium cannot handle.
+    try:
+        pdf = pypdfium2.PdfDocument(file_path)
+        try:
+            return pdf[page_index].get_textpage().get_text_bounded() or ""
+        finally:
+            pdf.close()
+    except Exception:
+        pass
+    
     try:
-        print(f"[INFO] Reading PDF: {file_path}")
-        text = ""
         with open(file_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
-            for page_num, page in enumerate(pdf_reader.pages):
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+            return pdf_reader.pages[page_index].extract_text() or ""
+    except Exception as e:
+        print(f"[ERROR] Failed to extract page {page_index} of {file_path}: {e}")
+        return ""
+
+def read_pdf_file(file_path: str) -> str:
+    try:
+        print(f"[INFO] Reading PDF: {file_path}")
+        try:
+            pdf = pypdfium2.PdfDocument(file_path)
+            num_pages = len(pdf)
+            pdf.close()
+        except Exception:
+            with open(file_path, 'rb') as file:
+                num_pages = len(PyPDF2.PdfReader(file).pages)
+
+        if num_pages == 0:
+            return ""
+
+        # Text extraction is CPU-bound, so farm pages out to worker processes
+        # and join the results back in page order.
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            page_texts = list(executor.map(
+                _extract_pdf_page,
+                [file_path] * num_pages,
+                range(num_pages)
+            ))
+
+        text = "\n".join(page_text for page_text in page_texts if page_text)
         return clean_text(text)
     except Exception as e:
         print(f"[ERROR] Failed to read PDF {file_path}: {e}")
@@ -73,7 +120,7 @@ def load_documents(file_paths: List[str]) -> List[Document]:
 
 def store_in_vector_db(docs: List[Document], save_path: str):
     print("[INFO] Embedding and saving documents to vector DB...")
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    embeddings = get_embeddings()
     vectorstore = FAISS.from_documents(docs, embeddings)
     vectorstore.save_local(save_path)
     print(f"[SUCCESS] Vector store saved to: {save_path}")
@@ -1,11 +1,16 @@
+import re
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
 from typing import List
+
+try:
+    from sources._embeddings import get_embeddings
+except ImportError:
+    from _embeddings import get_embeddings
 import json
 from datetime import datetime
 
@@ -29,8 +34,15 @@ MANUAL_INPUTS = [
 
 VECTOR_DB_DIR = "vector_store"
 
+_WS_RE = re.compile(r"\s+")
+# Whitespace runs or any whitespace other than a plain space (\n, \t, \r,
+# \x0b, \x0c...) mean a field still needs the clean_text pass
+_NEEDS_CLEAN_RE = re.compile(r"\s\s|[^\S ]")
+
 def clean_text(text: str) -> str:
-    return ' '.join(text.split())
+    # One C-level regex pass instead of split/join, which materializes a
+    # list of every token before re-joining.
+    return _WS_RE.sub(' ', text).strip()
 
 def validate_manual_input(input_data: dict) -> bool:
     required_fields = ['title', 'content']
@@ -51,9 +63,14 @@ def process_manual_input(input_data: dict) -> str:
         
         print(f"[INFO] Processing manual input: {title}")
         
-        # Format the content with metadata
-        formatted_content = f"Title: {title}\nCategory: {category}\nContent: {content}"
-        return clean_text(formatted_content)
+        # Hand-authored entries are already single-spaced after strip(), so
+        # build the final form directly and only pay the clean_text pass
+        # when a field actually contains a whitespace run or any
+        # non-space whitespace.
+        if any(_NEEDS_CLEAN_RE.search(field) for field in (title, category, content)):
+            return clean_text(f"Title: {title}\nCategory: {category}\nContent: {content}")
+        
+        return f"Title: {title} Category: {category} Content: {content}"
         
     except Exception as e:
         print(f"[ERROR] Failed to process manual input '{input_data.get('title', 'Unknown')}': {e}")
@@ -77,7 +94,7 @@ def load_documents(manual_inputs: List[dict]) -> List[Document]:
 def store_in_vector_db(docs: List[Document], save_path: str):
     # Embed documents and store them in a FAISS vector DB.
     print("[INFO] Embedding and saving documents to vector DB...")
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    embeddings = get_embeddings()
     vectorstore = FAISS.from_documents(docs, embeddings)
     vectorstore.save_local(save_path)
     print(f"[SUCCESS] Vector store saved to: {save_path}")
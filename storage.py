@@ -1,28 +1,58 @@
 import os
-import json
+import math
+import atexit
+import hashlib
+import sqlite3
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+import orjson
 from dotenv import load_dotenv
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
+import faiss
+import numpy as np
+
+from sources._embeddings import get_embeddings
 
 load_dotenv()
 
 # Configuration
 STORAGE_DIR = "storage"
 VECTOR_DB_DIR = "vector_store"
-METADATA_FILE = "metadata.json"
+METADATA_FILE = "metadata.ndjson"
+LEGACY_METADATA_FILE = "metadata.json"
+EMBEDDING_CACHE_FILE = "embedding_cache.db"
+IVF_PQ_MIN_VECTORS = 10000  # below this, IVF training is unreliable; use HNSW
+ADD_BATCH_ROWS = 4096  # add vectors in slices that stay cache-resident
 
 class DocumentStorage:
     # Handles storage operations for documents and metadata.
     
-    def __init__(self, storage_dir: str = STORAGE_DIR):
+    def __init__(self, storage_dir: str = STORAGE_DIR, index_factory: str = None,
+                 nlist: int = None, pq_m: int = 32, pq_nbits: int = 8,
+                 embedding_dtype: str = None):
         self.storage_dir = Path(storage_dir)
         self.vector_db_dir = Path(VECTOR_DB_DIR)
         self.metadata_file = self.storage_dir / METADATA_FILE
+        self.embedding_cache_file = self.storage_dir / EMBEDDING_CACHE_FILE
+        self.index_factory = index_factory
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+        self.embedding_dtype = embedding_dtype
+        self._metadata_buffer = []
         self._ensure_directories()
+        self._migrate_legacy_metadata()
+        # Cover callers that never flush explicitly or via a with-block
+        atexit.register(self.flush)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
     
     def _ensure_directories(self):
         # Create storage directories if they don't exist.
@@ -30,6 +60,23 @@ class DocumentStorage:
         self.vector_db_dir.mkdir(parents=True, exist_ok=True)
         print(f"[INFO] Storage directories ensured: {self.storage_dir}, {self.vector_db_dir}")
     
+    def _migrate_legacy_metadata(self):
+        # One-shot conversion of the old rewrite-the-whole-file metadata.json
+        # to the append-only NDJSON format.
+        legacy_file = self.storage_dir / LEGACY_METADATA_FILE
+        if not legacy_file.exists() or self.metadata_file.exists():
+            return
+        try:
+            with open(legacy_file, 'rb') as f:
+                entries = orjson.loads(f.read())
+            with open(self.metadata_file, 'wb') as f:
+                for entry in entries:
+                    f.write(orjson.dumps(entry) + b"\n")
+            legacy_file.unlink()
+            print(f"[INFO] Migrated {len(entries)} metadata entries to: {self.metadata_file}")
+        except Exception as e:
+            print(f"[ERROR] Failed to migrate legacy metadata: {e}")
+    
     def save_documents_as_json(self, documents: List[Document], filename: str = "documents.json") -> bool:
         # Save documents as JSON file.
         try:
@@ -45,9 +92,9 @@ class DocumentStorage:
                 }
                 doc_data.append(doc_dict)
             
-            # Save to JSON
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(doc_data, f, indent=2, ensure_ascii=False)
+            # Save to JSON (orjson serializes ~5-10x faster and emits bytes)
+            with open(file_path, 'wb') as f:
+                f.write(orjson.dumps(doc_data, option=orjson.OPT_INDENT_2))
             
             print(f"[SUCCESS] Saved {len(documents)} documents to: {file_path}")
             
@@ -75,8 +122,8 @@ class DocumentStorage:
                 print(f"[ERROR] JSON file not found: {file_path}")
                 return []
             
-            with open(file_path, 'r', encoding='utf-8') as f:
-                doc_data = json.load(f)
+            with open(file_path, 'rb') as f:
+                doc_data = orjson.loads(f.read())
             
             # Convert back to Document objects
             documents = []
@@ -124,6 +171,83 @@ class DocumentStorage:
             print(f"[ERROR] Failed to save raw text: {e}")
             return False
     
+    def _embed_with_cache(self, embeddings, texts: List[str]) -> np.ndarray:
+        # Embed texts, reusing vectors cached by (model, sha256(content)) so
+        # re-runs over unchanged documents skip the model entirely. The model
+        # identifier is part of the key: vectors from different models,
+        # backends or dtypes (fp32 vs fp16 vs dynamic int8 on the torch
+        # backend) are not interchangeable.
+        model_id = (
+            f"{getattr(embeddings, 'model_name', type(embeddings).__name__)}"
+            f":{getattr(embeddings, 'backend', '')}"
+            f":{getattr(embeddings, 'dtype', '')}"
+        )
+        conn = sqlite3.connect(self.embedding_cache_file)
+        try:
+            # Drop caches written with the old hash-only schema; they carry no
+            # model column and may hold vectors from a different model.
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(embeddings)")]
+            if columns and "model" not in columns:
+                conn.execute("DROP TABLE embeddings")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(model TEXT, hash TEXT, vector BLOB, PRIMARY KEY (model, hash))"
+            )
+
+            hashes = [hashlib.sha256(text.encode('utf-8')).hexdigest() for text in texts]
+            vectors = [None] * len(texts)
+            miss_indices = []
+
+            for i, text_hash in enumerate(hashes):
+                row = conn.execute(
+                    "SELECT vector FROM embeddings WHERE model = ? AND hash = ?",
+                    (model_id, text_hash)
+                ).fetchone()
+                if row:
+                    vectors[i] = np.frombuffer(row[0], dtype=np.float32)
+                else:
+                    miss_indices.append(i)
+
+            print(f"[INFO] Embedding cache: {len(texts) - len(miss_indices)} hits, {len(miss_indices)} misses")
+
+            if miss_indices:
+                new_vectors = np.asarray(
+                    embeddings.embed_documents([texts[i] for i in miss_indices]),
+                    dtype=np.float32
+                )
+                for i, vector in zip(miss_indices, new_vectors):
+                    vectors[i] = vector
+                    conn.execute(
+                        "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                        (model_id, hashes[i], vector.tobytes())
+                    )
+                conn.commit()
+            
+            return np.asarray(vectors, dtype=np.float32)
+        finally:
+            conn.close()
+    
+    def _build_index(self, vectors: np.ndarray) -> faiss.Index:
+        # Build a compressed IVF+PQ index instead of the flat index
+        # FAISS.from_documents would create (O(N) search, full fp32 storage).
+        # Small corpora fall back to HNSW, which needs no training.
+        num_vectors, dim = vectors.shape
+        
+        if self.index_factory:
+            index = faiss.index_factory(dim, self.index_factory)
+        elif num_vectors < IVF_PQ_MIN_VECTORS:
+            index = faiss.IndexHNSWFlat(dim, 32)
+        else:
+            nlist = self.nlist or int(math.sqrt(num_vectors))
+            quantizer = faiss.IndexFlatL2(dim)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, self.pq_m, self.pq_nbits)
+        
+        if not index.is_trained:
+            index.train(vectors)
+        for start in range(0, num_vectors, ADD_BATCH_ROWS):
+            index.add(vectors[start:start + ADD_BATCH_ROWS])
+        return index
+    
     def store_in_vector_db(self, documents: List[Document], save_path: str = None) -> bool:
         # Store documents in FAISS vector database.
         try:
@@ -135,8 +259,19 @@ class DocumentStorage:
             
             print(f"[INFO] Embedding and saving {len(documents)} documents to vector DB...")
             
-            embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-            vectorstore = FAISS.from_documents(documents, embeddings)
+            embeddings = get_embeddings(dtype=self.embedding_dtype)
+            texts = [doc.page_content for doc in documents]
+            vectors = np.ascontiguousarray(self._embed_with_cache(embeddings, texts), dtype=np.float32)
+            # With unit-norm vectors, L2 ordering is equivalent to cosine
+            faiss.normalize_L2(vectors)
+            
+            index = self._build_index(vectors)
+            vectorstore = FAISS(
+                embedding_function=embeddings,
+                index=index,
+                docstore=InMemoryDocstore({str(i): doc for i, doc in enumerate(documents)}),
+                index_to_docstore_id={i: str(i) for i in range(len(documents))}
+            )
             vectorstore.save_local(save_path)
             
             print(f"[SUCCESS] Vector store saved to: {save_path}")
@@ -147,6 +282,7 @@ class DocumentStorage:
                 "document_count": len(documents),
                 "saved_at": datetime.now().isoformat(),
                 "vector_db_path": save_path,
+                "index_type": type(index).__name__,
                 "embedding_model": "sentence-transformers/all-MiniLM-L6-v2"
             })
             
@@ -165,7 +301,7 @@ class DocumentStorage:
                 print(f"[ERROR] Vector DB path not found: {load_path}")
                 return None
             
-            embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+            embeddings = get_embeddings(dtype=self.embedding_dtype)
             vectorstore = FAISS.load_local(load_path, embeddings, allow_dangerous_deserialization=True)
             
             print(f"[SUCCESS] Loaded vector DB from: {load_path}")
@@ -175,27 +311,19 @@ class DocumentStorage:
             print(f"[ERROR] Failed to load vector DB: {e}")
             return None
     
-    def save_processing_log(self, log_data: Dict[str, Any], log_filename: str = "processing_log.json") -> bool:
-        # Save processing log with URLs/files processed.
+    def save_processing_log(self, log_data: Dict[str, Any], log_filename: str = "processing_log.ndjson") -> bool:
+        # Append one log entry with URLs/files processed (NDJSON, no
+        # read-modify-write of the whole log).
         try:
             log_path = self.storage_dir / log_filename
             
-            # Load existing log if it exists
-            existing_logs = []
-            if log_path.exists():
-                with open(log_path, 'r', encoding='utf-8') as f:
-                    existing_logs = json.load(f)
-            
-            # Add new log entry
             log_entry = {
                 "timestamp": datetime.now().isoformat(),
                 **log_data
             }
-            existing_logs.append(log_entry)
             
-            # Save updated log
-            with open(log_path, 'w', encoding='utf-8') as f:
-                json.dump(existing_logs, f, indent=2, ensure_ascii=False)
+            with open(log_path, 'ab') as f:
+                f.write(orjson.dumps(log_entry) + b"\n")
             
             print(f"[SUCCESS] Processing log saved to: {log_path}")
             return True
@@ -205,27 +333,36 @@ class DocumentStorage:
             return False
     
     def _update_metadata(self, metadata: Dict[str, Any]):
-        # Update metadata file with operation information.
+        # Buffer entries in memory; flush() appends them all in one write
+        # instead of opening the file once per operation.
+        self._metadata_buffer.append(metadata)
+    
+    def flush(self):
+        # Append all buffered metadata entries (NDJSON) in a single write.
+        if not self._metadata_buffer:
+            return
         try:
-            # Load existing metadata
-            existing_metadata = []
-            if self.metadata_file.exists():
-                with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                    existing_metadata = json.load(f)
-            
-            # Add new metadata entry
-            existing_metadata.append(metadata)
-            
-            # Save updated metadata
-            with open(self.metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(existing_metadata, f, indent=2, ensure_ascii=False)
+            with open(self.metadata_file, 'ab') as f:
+                for entry in self._metadata_buffer:
+                    f.write(orjson.dumps(entry) + b"\n")
+            self._metadata_buffer.clear()
             
         except Exception as e:
-            print(f"[ERROR] Failed to update metadata: {e}")
+            print(f"[ERROR] Failed to flush metadata: {e}")
+    
+    def _scan_files(self, directory):
+        # Single-pass recursive walk; DirEntry carries stat info cached from
+        # readdir, avoiding a separate stat syscall and Path object per file.
+        for entry in os.scandir(directory):
+            if entry.is_file(follow_symlinks=False):
+                yield entry
+            elif entry.is_dir(follow_symlinks=False):
+                yield from self._scan_files(entry.path)
     
     def get_storage_stats(self) -> Dict[str, Any]:
         # Get storage statistics.
         try:
+            self.flush()
             stats = {
                 "storage_directory": str(self.storage_dir),
                 "vector_db_directory": str(self.vector_db_dir),
@@ -238,18 +375,17 @@ class DocumentStorage:
             
             # Count files and calculate size
             if self.storage_dir.exists():
-                for file_path in self.storage_dir.rglob('*'):
-                    if file_path.is_file():
-                        stats["files_in_storage"] += 1
-                        stats["total_storage_size"] += file_path.stat().st_size
+                for entry in self._scan_files(self.storage_dir):
+                    stats["files_in_storage"] += 1
+                    stats["total_storage_size"] += entry.stat().st_size
             
             # Get metadata info
             if self.metadata_file.exists():
-                with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                    stats["metadata_entries"] = len(metadata)
-                    if metadata:
-                        stats["last_updated"] = metadata[-1].get("saved_at")
+                with open(self.metadata_file, 'rb') as f:
+                    metadata = [orjson.loads(line) for line in f if line.strip()]
+                stats["metadata_entries"] = len(metadata)
+                if metadata:
+                    stats["last_updated"] = metadata[-1].get("saved_at")
             
             return stats
             
@@ -261,15 +397,13 @@ class DocumentStorage:
         # Clean up files older than specified days.
         try:
             from datetime import timedelta
-            cutoff_date = datetime.now() - timedelta(days=days_old)
+            cutoff_timestamp = (datetime.now() - timedelta(days=days_old)).timestamp()
             removed_count = 0
             
-            for file_path in self.storage_dir.rglob('*'):
-                if file_path.is_file():
-                    file_modified = datetime.fromtimestamp(file_path.stat().st_mtime)
-                    if file_modified < cutoff_date:
-                        file_path.unlink()
-                        removed_count += 1
+            for entry in self._scan_files(self.storage_dir):
+                if entry.stat().st_mtime < cutoff_timestamp:
+                    os.unlink(entry.path)
+                    removed_count += 1
             
             print(f"[SUCCESS] Cleaned up {removed_count} old files")
             return True
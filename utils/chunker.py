@@ -1,135 +1,242 @@
 import re
-from typing import List
+import os
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterator, List
+import numpy as np
 from langchain_core.documents import Document
 
-def chunk_text_by_size(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
-    # Split text into chunks of specified size with overlap.
-    if not text or chunk_size <= 0:
-        return []
-    
-    chunks = []
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Bounded LRU of computed chunk lists, keyed by content hash + parameters,
+# so re-chunking identical documents (re-runs, duplicate scrapes) is free.
+_CHUNK_CACHE = OrderedDict()
+_CHUNK_CACHE_MAX = 1024
+
+_PARALLEL_MIN_DOCS = 8  # below this, pool spawn cost outweighs the win
+_LARGE_TEXT_THRESHOLD = 1 << 20  # 1 MB; above this, slice bytes lazily
+
+# Map ! and ? onto . so sentence splitting is a plain str.split, which uses
+# CPython's SIMD memchr fast path instead of the regex engine
+_SENT_TRANS = str.maketrans({'!': '.', '?': '.'})
+_PARA_SPLIT_RE = re.compile(r'\n\s*\n')
+
+def _align_utf8_start(buf: bytes, pos: int) -> int:
+    # Walk back to a codepoint start (UTF-8 continuation bytes are 10xxxxxx)
+    while pos > 0 and (buf[pos] & 0xC0) == 0x80:
+        pos -= 1
+    return pos
+
+def _chunk_large_text_by_size(text: str, chunk_size: int, overlap: int):
+    # Large-input path: slice the UTF-8 encoding through a memoryview and
+    # decode each chunk only as it is yielded, so peak memory holds the
+    # bytes plus one chunk instead of every str slice at once. Boundaries
+    # are aligned to codepoint starts, so chunk sizes are measured in bytes
+    # here — an acceptable approximation at megabyte scale.
+    buf = text.encode('utf-8')
+    view = memoryview(buf)
+    buf_length = len(buf)
+    stride = chunk_size - overlap if overlap < chunk_size else chunk_size
     start = 0
-    text_length = len(text)
     
-    while start < text_length:
+    while start < buf_length:
         end = start + chunk_size
-        if end > text_length:
-            end = text_length
+        if end >= buf_length:
+            end = buf_length
+        else:
+            end = _align_utf8_start(buf, end)
+            if end <= start:
+                end = min(start + chunk_size, buf_length)
         
-        chunk = text[start:end]
-        chunks.append(chunk.strip())
+        chunk = bytes(view[start:end]).decode('utf-8', errors='ignore').strip()
+        if chunk:
+            yield chunk
         
-        if end == text_length:
+        if end == buf_length:
             break
         
-        start = end - overlap
-        if start <= 0:
-            start = end
+        next_start = _align_utf8_start(buf, start + stride)
+        start = next_start if next_start > start else end
+
+def chunk_text_by_size(text: str, chunk_size: int = 1000, overlap: int = 200) -> Iterator[str]:
+    # Split text into chunks of specified size with overlap, lazily: for a
+    # large document the chunks no longer all exist at once alongside the
+    # original text. Use chunk_text_by_size_list when a list is needed.
+    if not text or chunk_size <= 0:
+        return
+    
+    text_length = len(text)
+    
+    if text_length > _LARGE_TEXT_THRESHOLD:
+        yield from _chunk_large_text_by_size(text, chunk_size, overlap)
+        return
     
-    return [chunk for chunk in chunks if chunk]
+    # Precompute every (start, end) offset pair in C instead of stepping a
+    # Python loop; choosing a positive stride up front also removes the old
+    # backwards-start edge case when overlap >= chunk_size.
+    stride = chunk_size - overlap if overlap < chunk_size else chunk_size
+    starts = np.arange(0, text_length, stride)
+    ends = np.minimum(starts + chunk_size, text_length)
+    
+    # Stop at the first chunk that reaches the end of the text
+    last = int(np.searchsorted(ends, text_length)) + 1
+    
+    for s, e in zip(starts[:last].tolist(), ends[:last].tolist()):
+        chunk = text[s:e].strip()
+        if chunk:
+            yield chunk
 
-def chunk_by_sentences(text: str, max_chunk_size: int = 1000) -> List[str]:
+def chunk_text_by_size_list(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
+    return list(chunk_text_by_size(text, chunk_size, overlap))
+
+def chunk_by_sentences(text: str, max_chunk_size: int = 1000) -> Iterator[str]:
     # Split text into chunks by sentences, respecting max chunk size.
     if not text:
-        return []
+        return
     
-    # Split by sentences using multiple delimiters
-    sentences = re.split(r'[.!?]+', text)
-    sentences = [s.strip() for s in sentences if s.strip()]
+    # Split by sentences: fold the delimiters onto '.' first, then split on
+    # the single literal character
+    sentences = [s.strip() for s in text.translate(_SENT_TRANS).split('.') if s.strip()]
+    if not sentences:
+        return
     
-    chunks = []
-    current_chunk = ""
-    
-    for sentence in sentences:
-        # Check if adding this sentence would exceed max size
-        if len(current_chunk) + len(sentence) + 1 > max_chunk_size:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = sentence
-            else:
-                # If single sentence is too long, split it
-                if len(sentence) > max_chunk_size:
-                    word_chunks = chunk_by_words(sentence, max_chunk_size)
-                    chunks.extend(word_chunks)
-                else:
-                    chunks.append(sentence)
+    # Cumulate sentence lengths (+2 for the ". " joiner) once, find each
+    # boundary by binary search, and join each chunk exactly once — the old
+    # loop grew current_chunk with +=, which is O(N^2) on long inputs.
+    lens = np.fromiter((len(s) + 2 for s in sentences), dtype=np.int64, count=len(sentences))
+    cum = np.cumsum(lens)
+    
+    start = 0
+    for stop in _partition_cumlen(cum, max_chunk_size):
+        if stop - start == 1 and len(sentences[start]) > max_chunk_size:
+            # Single sentence over budget: fall back to word-level splitting
+            yield from chunk_by_words(sentences[start], max_chunk_size)
         else:
-            if current_chunk:
-                current_chunk += ". " + sentence
-            else:
-                current_chunk = sentence
+            yield '. '.join(sentences[start:stop])
+        start = stop
+
+def chunk_by_sentences_list(text: str, max_chunk_size: int = 1000) -> List[str]:
+    return list(chunk_by_sentences(text, max_chunk_size))
+
+def _partition_cumlen_py(cum: np.ndarray, limit: int) -> List[int]:
+    boundaries = []
+    start = 0
+    total = len(cum)
     
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    while start < total:
+        base = cum[start - 1] if start else 0
+        stop = int(np.searchsorted(cum, base + limit, side='right'))
+        if stop == start:
+            stop = start + 1
+        boundaries.append(stop)
+        start = stop
     
-    return chunks
+    return boundaries
 
-def chunk_by_words(text: str, max_chunk_size: int = 1000) -> List[str]:
+if njit is not None:
+    # Same loop compiled to native code; the remaining per-boundary Python
+    # overhead disappears entirely on int64 arrays.
+    @njit(cache=True)
+    def _partition_cumlen_njit(cum, limit):
+        boundaries = np.empty(len(cum), dtype=np.int64)
+        count = 0
+        start = 0
+        total = len(cum)
+        
+        while start < total:
+            base = cum[start - 1] if start > 0 else 0
+            stop = int(np.searchsorted(cum, base + limit, side='right'))
+            if stop == start:
+                stop = start + 1
+            boundaries[count] = stop
+            count += 1
+            start = stop
+        
+        return boundaries[:count]
+
+def _partition_cumlen(cum: np.ndarray, limit: int) -> List[int]:
+    # Greedy segment boundaries over a cumulative-length array: each segment
+    # takes as many items as fit within `limit` (always at least one, so an
+    # oversize single item still gets emitted). Uses the numba-compiled scan
+    # when available, otherwise the pure-Python searchsorted loop.
+    if njit is not None:
+        return _partition_cumlen_njit(cum, limit).tolist()
+    return _partition_cumlen_py(cum, limit)
+
+def chunk_by_words(text: str, max_chunk_size: int = 1000) -> Iterator[str]:
     # Split text into chunks by words, respecting max chunk size.
     if not text:
-        return []
+        return
     
     words = text.split()
-    chunks = []
-    current_chunk = []
-    current_size = 0
+    if not words:
+        return
     
-    for word in words:
-        word_size = len(word) + 1  # +1 for space
-        
-        if current_size + word_size > max_chunk_size:
-            if current_chunk:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = [word]
-                current_size = len(word)
-            else:
-                # Single word is too long, add it anyway
-                chunks.append(word)
-        else:
-            current_chunk.append(word)
-            current_size += word_size
-    
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
+    # Word lengths (+1 for the joining space) summed once in C; boundaries
+    # then come from binary search instead of a per-word Python loop.
+    lens = np.fromiter((len(word) + 1 for word in words), dtype=np.int64, count=len(words))
+    cum = np.cumsum(lens)
     
-    return chunks
+    start = 0
+    for stop in _partition_cumlen(cum, max_chunk_size):
+        yield ' '.join(words[start:stop])
+        start = stop
 
-def chunk_by_paragraphs(text: str, max_chunk_size: int = 1000) -> List[str]:
-    # Split text into chunks by paragraphs, respecting max chunk size.
+def chunk_by_words_list(text: str, max_chunk_size: int = 1000) -> List[str]:
+    return list(chunk_by_words(text, max_chunk_size))
+
+def _chunk_by_paragraphs_flagged(text: str, max_chunk_size: int = 1000):
+    # Internal variant returning (chunk, already_split) pairs; the flag
+    # marks chunks that were already sub-chunked by sentences so
+    # smart_chunking does not split them a second time.
     if not text:
         return []
     
     # Split by paragraphs (double newlines or more)
-    paragraphs = re.split(r'\n\s*\n', text)
+    paragraphs = _PARA_SPLIT_RE.split(text)
     paragraphs = [p.strip() for p in paragraphs if p.strip()]
     
+    # Accumulate paragraphs in a list and join once per flush; growing a
+    # string with += re-copies the whole chunk on every append, which is
+    # O(N^2) on long inputs and defeats CPython's bytecode specialization.
     chunks = []
-    current_chunk = ""
+    current_parts = []
+    current_size = 0
     
     for paragraph in paragraphs:
         # Check if adding this paragraph would exceed max size
-        if len(current_chunk) + len(paragraph) + 2 > max_chunk_size:  # +2 for newlines
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = paragraph
+        if current_size + len(paragraph) + 2 > max_chunk_size:  # +2 for newlines
+            if current_parts:
+                chunks.append(("\n\n".join(current_parts), False))
+                current_parts = [paragraph]
+                current_size = len(paragraph)
             else:
                 # If single paragraph is too long, split it further
                 if len(paragraph) > max_chunk_size:
-                    para_chunks = chunk_by_sentences(paragraph, max_chunk_size)
-                    chunks.extend(para_chunks)
+                    chunks.extend((c, True) for c in chunk_by_sentences(paragraph, max_chunk_size))
                 else:
-                    chunks.append(paragraph)
+                    chunks.append((paragraph, False))
         else:
-            if current_chunk:
-                current_chunk += "\n\n" + paragraph
-            else:
-                current_chunk = paragraph
+            current_size = len(paragraph) if not current_parts else current_size + len(paragraph) + 2
+            current_parts.append(paragraph)
     
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    if current_parts:
+        chunks.append(("\n\n".join(current_parts), False))
     
     return chunks
 
+def chunk_by_paragraphs(text: str, max_chunk_size: int = 1000) -> Iterator[str]:
+    # Split text into chunks by paragraphs, respecting max chunk size.
+    return (chunk for chunk, _ in _chunk_by_paragraphs_flagged(text, max_chunk_size))
+
+def chunk_by_paragraphs_list(text: str, max_chunk_size: int = 1000) -> List[str]:
+    return list(chunk_by_paragraphs(text, max_chunk_size))
+
 def chunk_document(document: Document, chunk_size: int = 1000, overlap: int = 200, method: str = "size") -> List[Document]:
     # Chunk a document into smaller documents using specified method.
     if not document or not document.page_content:
@@ -137,55 +244,101 @@ def chunk_document(document: Document, chunk_size: int = 1000, overlap: int = 20
     
     text = document.page_content
     
-    # Choose chunking method
-    if method == "sentences":
-        chunks = chunk_by_sentences(text, chunk_size)
-    elif method == "words":
-        chunks = chunk_by_words(text, chunk_size)
-    elif method == "paragraphs":
-        chunks = chunk_by_paragraphs(text, chunk_size)
-    else:  # default to size-based chunking
-        chunks = chunk_text_by_size(text, chunk_size, overlap)
-    
-    # Create new documents for each chunk
+    # blake2b is the fastest stdlib hash for this; 16 bytes is plenty of key
+    cache_key = (
+        hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest(),
+        method, chunk_size, overlap
+    )
+    chunks = _CHUNK_CACHE.get(cache_key)
+    
+    if chunks is not None:
+        _CHUNK_CACHE.move_to_end(cache_key)
+    else:
+        # Choose chunking method (materialized here: the cache and the
+        # total_chunks metadata both need the full list)
+        if method == "sentences":
+            chunks = list(chunk_by_sentences(text, chunk_size))
+        elif method == "words":
+            chunks = list(chunk_by_words(text, chunk_size))
+        elif method == "paragraphs":
+            chunks = list(chunk_by_paragraphs(text, chunk_size))
+        else:  # default to size-based chunking
+            chunks = list(chunk_text_by_size(text, chunk_size, overlap))
+        
+        _CHUNK_CACHE[cache_key] = chunks
+        if len(_CHUNK_CACHE) > _CHUNK_CACHE_MAX:
+            _CHUNK_CACHE.popitem(last=False)
+    
+    # Create new documents for each chunk; each metadata dict is built as a
+    # single overlay of the shared base instead of a copy() + update() pair
+    base_metadata = document.metadata
+    total_chunks = len(chunks)
+    
+    # Every chunker already strips and filters its output, so trust it here
+    # instead of stripping each chunk twice more
     chunked_docs = []
     for i, chunk in enumerate(chunks):
-        if chunk.strip():
-            # Copy metadata and add chunk info
-            new_metadata = document.metadata.copy()
-            new_metadata.update({
-                "chunk_id": i,
-                "chunk_method": method,
-                "chunk_size": len(chunk),
-                "total_chunks": len(chunks)
-            })
-            
+        if chunk:
             chunked_docs.append(Document(
-                page_content=chunk.strip(),
-                metadata=new_metadata
+                page_content=chunk,
+                metadata={
+                    **base_metadata,
+                    "chunk_id": i,
+                    "chunk_method": method,
+                    "chunk_size": len(chunk),
+                    "total_chunks": total_chunks
+                }
             ))
     
     return chunked_docs
 
+def _chunk_one(document: Document, chunk_size: int, overlap: int, method: str) -> List[Document]:
+    # Module-level so it pickles for the worker processes.
+    return chunk_document(document, chunk_size=chunk_size, overlap=overlap, method=method)
+
+def chunk_documents(documents: List[Document], chunk_size: int = 1000, overlap: int = 200,
+                    method: str = "size", workers: int = None) -> List[Document]:
+    # Chunk a batch of documents, in parallel for large batches. The
+    # chunkers are pure-Python CPU work with no shared state, so worker
+    # processes scale near-linearly with cores.
+    if not documents:
+        return []
+    
+    if len(documents) < _PARALLEL_MIN_DOCS:
+        return [doc for document in documents
+                for doc in chunk_document(document, chunk_size, overlap, method)]
+    
+    workers = workers or os.cpu_count()
+    worker = partial(_chunk_one, chunk_size=chunk_size, overlap=overlap, method=method)
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            worker, documents,
+            chunksize=max(1, len(documents) // (4 * workers))
+        ))
+    
+    return [doc for chunked in results for doc in chunked]
+
 def smart_chunking(text: str, max_chunk_size: int = 1000, min_chunk_size: int = 100) -> List[str]:
     # Intelligent chunking that tries paragraphs first, then sentences, then words.
     if not text:
         return []
     
     # First try paragraph-based chunking
-    paragraph_chunks = chunk_by_paragraphs(text, max_chunk_size)
+    flagged_chunks = _chunk_by_paragraphs_flagged(text, max_chunk_size)
     
-    # If paragraphs are too small, combine them
-    if all(len(chunk) < min_chunk_size for chunk in paragraph_chunks) and len(paragraph_chunks) > 1:
-        return chunk_text_by_size(text, max_chunk_size, overlap=200)
+    # If paragraphs are too small, combine them (any() stops scanning at the
+    # first chunk that is big enough)
+    if len(flagged_chunks) > 1 and not any(len(chunk) >= min_chunk_size for chunk, _ in flagged_chunks):
+        return list(chunk_text_by_size(text, max_chunk_size, overlap=200))
     
-    # Check if any paragraph chunks are too large
+    # Check if any paragraph chunks are too large, skipping the ones the
+    # paragraph pass already split by sentences
     final_chunks = []
-    for chunk in paragraph_chunks:
-        if len(chunk) > max_chunk_size:
+    for chunk, already_split in flagged_chunks:
+        if not already_split and len(chunk) > max_chunk_size:
             # Split large paragraphs by sentences
-            sentence_chunks = chunk_by_sentences(chunk, max_chunk_size)
-            final_chunks.extend(sentence_chunks)
+            final_chunks.extend(chunk_by_sentences(chunk, max_chunk_size))
         else:
             final_chunks.append(chunk)
     
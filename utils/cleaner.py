@@ -1,33 +1,85 @@
 import re
+import html
 from typing import Optional
 from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
+
+# Patterns compiled once at import; the hot path scans short strings, so
+# per-call pattern lookup/compile overhead is measurable.
+_WS_RE = re.compile(r'\s+')
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPECIAL_KEEP_RE = re.compile(r'[^\w\s\-.,!?;:()\[\]{}"\'/]')
+_SPECIAL_STRIP_RE = re.compile(r'[^\w\s]')
+# ASCII translate tables mirroring the two patterns above: everything not in
+# the keep set maps to a space via one C-level hash lookup per character
+_ASCII_WORD_SPACE = set(
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_ \t\n\r\x0b\x0c"
+)
+_SPECIAL_KEEP_TRANS = {
+    i: ' ' for i in range(128)
+    if chr(i) not in _ASCII_WORD_SPACE and chr(i) not in set('-.,!?;:()[]{}"\'/')
+}
+_SPECIAL_STRIP_TRANS = {i: ' ' for i in range(128) if chr(i) not in _ASCII_WORD_SPACE}
+# Form feeds, newlines and tabs all map to space in one table lookup pass
+_PDF_TRANS = str.maketrans({'\x0c': ' ', '\n': ' ', '\t': ' '})
+_PAGENUM_RE = re.compile(r'^\d+\s*$', re.MULTILINE)
+# One alternation covers all the web junk so cleaning scans the page text
+# once instead of three times
+_WEB_JUNK_RE = re.compile(
+    r'(?:Cookie Policy|Privacy Policy|Terms of Service|Subscribe|Newsletter|Follow us'
+    r'|©\s*\d{4}.*?All Rights Reserved)',
+    re.IGNORECASE
+)
+# A single character class instead of the old five-branch alternation under
+# a +, which was both slower and a catastrophic-backtracking shape
+_URL_RE = re.compile(r'https?://[A-Za-z0-9$\-_@.&+!*(),%/:#?=]+', re.ASCII)
+# URLs and emails are ASCII by definition; re.ASCII turns \b and friends
+# into bitmap tests instead of Unicode-database lookups per character
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', re.ASCII)
 
 def clean_text(text: str) -> str:
-    # Clean and normalize text by removing extra whitespace.
+    # Clean and normalize text by removing extra whitespace. One C-level
+    # regex pass instead of split/join, which materializes a list of every
+    # token before re-joining.
     if not text:
         return ""
-    return ' '.join(text.split())
+    return _WS_RE.sub(' ', text).strip()
 
 def remove_html_tags(html_content: str) -> str:
-    # Remove HTML tags from content using BeautifulSoup.
+    # Remove HTML tags from content.
     if not html_content:
         return ""
     
+    # Small fragments (markdown-embedded HTML, snippets) don't need a real
+    # parse: one tag-strip regex plus entity unescape does the job, as long
+    # as there is no script/style content to drop. Tag names are
+    # case-insensitive, so probe a lowercased copy.
+    if len(html_content) < 16384:
+        probe = html_content.lower()
+        if '<script' not in probe and '<style' not in probe:
+            return _WS_RE.sub(' ', html.unescape(_TAG_RE.sub(' ', html_content))).strip()
+    
+    # selectolax (Lexbor, C) parses 10-30x faster than BeautifulSoup over
+    # html.parser, and one whitespace regex replaces the old three-stage
+    # generator cleanup. BeautifulSoup stays as a fallback for markup
+    # Lexbor cannot handle.
+    try:
+        tree = HTMLParser(html_content)
+        for node in tree.css('script,style'):
+            node.decompose()
+        return _WS_RE.sub(' ', tree.text(separator=' ')).strip()
+    except Exception:
+        pass
+    
     try:
         soup = BeautifulSoup(html_content, 'html.parser')
         # Remove script and style elements
         for script in soup(["script", "style"]):
             script.decompose()
         
-        # Get text content
-        text = soup.get_text()
-        
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        return text
+        # Collapse all whitespace runs in one C-level pass instead of the
+        # old three nested generator pipelines
+        return _WS_RE.sub(' ', soup.get_text()).strip()
     except Exception as e:
         print(f"[ERROR] Failed to remove HTML tags: {e}")
         return html_content
@@ -37,7 +89,7 @@ def normalize_whitespace(text: str) -> str:
     if not text:
         return ""
     # Replace multiple whitespace characters with single space
-    normalized = re.sub(r'\s+', ' ', text)
+    normalized = _WS_RE.sub(' ', text)
     return normalized.strip()
 
 def remove_special_characters(text: str, keep_basic_punctuation: bool = True) -> str:
@@ -45,12 +97,18 @@ def remove_special_characters(text: str, keep_basic_punctuation: bool = True) ->
     if not text:
         return ""
     
+    if text.isascii():
+        # Fast path: str.translate replaces the regex entirely for ASCII
+        # input, which is the overwhelming common case
+        table = _SPECIAL_KEEP_TRANS if keep_basic_punctuation else _SPECIAL_STRIP_TRANS
+        return normalize_whitespace(text.translate(table))
+    
     if keep_basic_punctuation:
         # Keep basic punctuation: . , ! ? ; : ( ) [ ] { } " ' /
-        cleaned = re.sub(r'[^\w\s\-.,!?;:()\[\]{}"\'/]', ' ', text)
+        cleaned = _SPECIAL_KEEP_RE.sub(' ', text)
     else:
         # Keep only alphanumeric characters and spaces
-        cleaned = re.sub(r'[^\w\s]', ' ', text)
+        cleaned = _SPECIAL_STRIP_RE.sub(' ', text)
     
     return normalize_whitespace(cleaned)
 
@@ -59,13 +117,12 @@ def clean_pdf_text(text: str) -> str:
     if not text:
         return ""
     
-    # Remove common PDF artifacts
-    text = re.sub(r'\x0c', ' ', text)  # Remove form feed characters
-    text = re.sub(r'\n+', ' ', text)   # Replace multiple newlines with space
-    text = re.sub(r'\t+', ' ', text)   # Replace tabs with space
+    # Remove common PDF artifacts (form feeds, newlines, tabs -> space) in
+    # a single str.translate pass instead of three regex scans
+    text = text.translate(_PDF_TRANS)
     
     # Remove page numbers (assuming they're standalone numbers)
-    text = re.sub(r'^\d+\s*$', '', text, flags=re.MULTILINE)
+    text = _PAGENUM_RE.sub('', text)
     
     # Clean and normalize
     return clean_text(text)
@@ -78,10 +135,8 @@ def clean_web_content(html_content: str) -> str:
     # First remove HTML tags
     text = remove_html_tags(html_content)
     
-    # Remove common web artifacts
-    text = re.sub(r'Cookie Policy|Privacy Policy|Terms of Service', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'©\s*\d{4}.*?All Rights Reserved', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'Subscribe|Newsletter|Follow us', '', text, flags=re.IGNORECASE)
+    # Remove common web artifacts in a single pass
+    text = _WEB_JUNK_RE.sub('', text)
     
     # Clean and normalize
     return clean_text(text)
@@ -92,8 +147,7 @@ def remove_urls(text: str) -> str:
         return ""
     
     # Remove URLs
-    url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-    text = re.sub(url_pattern, '', text)
+    text = _URL_RE.sub('', text)
     
     return normalize_whitespace(text)
 
@@ -103,8 +157,7 @@ def remove_emails(text: str) -> str:
         return ""
     
     # Remove email addresses
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    text = re.sub(email_pattern, '', text)
+    text = _EMAIL_RE.sub('', text)
     
     return normalize_whitespace(text)
 